@@ -15,7 +15,7 @@ import json
 
 # Will be implemented with:
 # - sentence-transformers for local embeddings (free)
-# - ChromaDB or FAISS for vector storage
+# - FAISS for vector storage, with metadata in SQLite
 # - Chunking strategy for large files
 # - Metadata preservation from indexer
 
@@ -32,6 +32,7 @@ class EmbeddingsSearcher:
     def __init__(self, project_root: Path):
         self.project_root = project_root
         self.embeddings_path = Path(__file__).parent / 'embeddings_index.db'
+        self.faiss_path = Path(__file__).parent / 'embeddings.faiss'
         
     def build_embeddings(self):
         """
@@ -40,14 +41,15 @@ class EmbeddingsSearcher:
         Steps:
         1. Load existing index from indexer.py
         2. Chunk large files intelligently (by function/class)
-        3. Generate embeddings using sentence-transformers
-        4. Store in ChromaDB with metadata
+        3. Generate embeddings using sentence-transformers (INT8-quantized
+           on CPU), in large length-sorted batches (see implementation notes)
+        4. Store vectors in a FAISS index, metadata in SQLite keyed by vector id
         5. Can run overnight, ~30 min for large codebases
         """
         print("🚧 Embeddings support coming soon!")
         print("   Will use sentence-transformers (local, free)")
         print("   Expected build time: 10-30 minutes")
-        print("   Memory usage: ~2-4GB")
+        print("   Memory usage: ~1-2GB (INT8-quantized model)")
         
     def search(self, query: str, limit: int = 10) -> List[Dict[str, Any]]:
         """
@@ -88,7 +90,7 @@ def main():
         print("\nThis will install:")
         print("   • sentence-transformers (local embedding model)")
         print("   • torch (neural network backend)")
-        print("   • chromadb (vector database)")
+        print("   • faiss-cpu (vector index)")
         print("\nOnce installed, uncomment the implementation in this file.")
     elif args.search:
         print(f"🔍 Searching for: {args.search}")
@@ -107,26 +109,63 @@ if __name__ == '__main__':
 # 
 # When ready to implement, uncomment and use:
 #
+# import numpy as np
+# import torch
 # from sentence_transformers import SentenceTransformer
-# import chromadb
+# import faiss
+# import sqlite3
 # 
-# model = SentenceTransformer('all-MiniLM-L6-v2')  # Fast, good quality
-# client = chromadb.PersistentClient(path=str(self.embeddings_path))
-# collection = client.get_or_create_collection("codebase")
+# model = SentenceTransformer('all-MiniLM-L6-v2', device='cpu')  # Fast, good quality
+# # Dynamic INT8 quantization of the Linear layers: ~2-4x faster CPU inference
+# # and about half the memory, with marginal quality loss. Query embeddings
+# # must come from the same quantized model.
+# model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
 # 
-# For each code component:
-#   text = f"{comp.name}\n{comp.docstring}\n{comp.signature}"
-#   embedding = model.encode(text)
-#   collection.add(
-#       embeddings=[embedding],
-#       documents=[text],
-#       metadatas=[{"filepath": comp.filepath, "line": comp.line_start}],
-#       ids=[f"{comp.filepath}:{comp.line_start}"]
+# # Cosine similarity = inner product on normalized embeddings. HNSW (M=32)
+# # keeps insert and query cost flat as the index grows; CPU-only indexes
+# # stay portable across machines.
+# index = faiss.IndexIDMap(faiss.IndexHNSWFlat(384, 32, faiss.METRIC_INNER_PRODUCT))
+# 
+# # Large codebases: flat FP32 vectors cost 384 * 4 bytes each (~1.5GB per 1M).
+# # IVF-PQ stores 48 one-byte codes per vector instead (~32x smaller) and only
+# # probes a few posting lists per query. It must be trained before add(), and
+# # needs ~40 training vectors per list, so size nlist to the component count:
+# #   nlist = min(1024, max(1, len(components) // 40))
+# #   quantizer = faiss.IndexFlatIP(384)
+# #   index = faiss.IndexIVFPQ(quantizer, 384, nlist, 48, 8, faiss.METRIC_INNER_PRODUCT)
+# #   index.train(embeddings[np.random.permutation(len(embeddings))[:nlist * 256]])
+# #   index.nprobe = 16  # Recall vs. speed; raise if results look off
+# db = sqlite3.connect(self.embeddings_path)
+# db.execute("CREATE TABLE IF NOT EXISTS components "
+#            "(id INTEGER PRIMARY KEY, filepath TEXT, line INTEGER, document TEXT)")
+# 
+# Encode all components in one batched call rather than once per component;
+# per-call overhead dominates otherwise. Sorting by length keeps similar-length
+# texts in the same batch so padding is minimal:
+#   texts = [f"{comp.name}\n{comp.docstring}\n{comp.signature}" for comp in components]
+#   order = np.argsort([len(t) for t in texts])
+#   sorted_embeddings = model.encode(
+#       [texts[i] for i in order],
+#       batch_size=64,
+#       show_progress_bar=True,
+#       convert_to_numpy=True,
+#       normalize_embeddings=True,
 #   )
+#   embeddings = np.empty_like(sorted_embeddings)
+#   embeddings[order] = sorted_embeddings  # Back to component order
+#   ids = np.arange(len(components), dtype=np.int64)
+#   index.add_with_ids(embeddings, ids)
+#   db.executemany(
+#       "INSERT INTO components VALUES (?, ?, ?, ?)",
+#       [(int(i), c.filepath, c.line_start, t) for i, c, t in zip(ids, components, texts)]
+#   )
+#   db.commit()
+#   faiss.write_index(index, str(self.faiss_path))
 # 
 # To search:
-#   query_embedding = model.encode(query)
-#   results = collection.query(
-#       query_embeddings=[query_embedding],
-#       n_results=limit
-#   )
+#   index = faiss.read_index(str(self.faiss_path))
+#   query_embedding = model.encode([query], normalize_embeddings=True)
+#   scores, ids = index.search(query_embedding, limit)
+#   rows = [db.execute("SELECT filepath, line, document FROM components WHERE id = ?",
+#                      (int(i),)).fetchone()
+#           for i in ids[0] if i != -1]
@@ -4,15 +4,36 @@ Parses Python files, SQL, templates, and documentation to build a searchable ind
 """
 
 import ast
+import inspect
 import json
+import os
 import re
+import sys
+import time
 from pathlib import Path
-from typing import Dict, List, Set, Any
-from dataclasses import dataclass, asdict
+from typing import Dict, Iterable, List, Set, Any, Tuple
+from dataclasses import dataclass, fields
 from datetime import datetime
+from array import array
+from bisect import bisect_right
+from concurrent.futures import ProcessPoolExecutor
+from fnmatch import fnmatch
+from operator import attrgetter
 
+try:
+    import orjson  # Optional: much faster index serialization
+except ImportError:
+    orjson = None
 
-@dataclass
+
+_CREATE_TABLE_RE = re.compile(
+    r'CREATE\s+TABLE\s+(?:IF\s+NOT\s+EXISTS\s+)?([a-z_][a-z0-9_]*)', re.IGNORECASE
+)
+_MD_TITLE_RE = re.compile(r'^#\s+(.+)$', re.MULTILINE)
+_NAME_KEY = attrgetter('name')
+
+
+@dataclass(slots=True)
 class CodeComponent:
     """Represents a searchable code component."""
     type: str  # 'function', 'class', 'route', 'model', 'table', 'file'
@@ -22,20 +43,480 @@ class CodeComponent:
     line_end: int
     docstring: str = ""
     signature: str = ""
-    decorators: List[str] = None
+    decorators: Tuple[str, ...] = None
     parent_class: str = ""
-    imports: List[str] = None
+    imports: Tuple[str, ...] = None
     metadata: Dict[str, Any] = None
     
     def __post_init__(self):
         if self.decorators is None:
-            self.decorators = []
+            self.decorators = ()
         if self.imports is None:
-            self.imports = []
+            self.imports = ()
         if self.metadata is None:
             self.metadata = {}
 
 
+_COMPONENT_FIELDS = tuple(f.name for f in fields(CodeComponent))
+
+
+@dataclass(slots=True, frozen=True)
+class SearchHit:
+    """A ranked search result: the matched component's display fields and score."""
+    type: str
+    name: str
+    filepath: str
+    line_start: int
+    line_end: int
+    score: int
+    docstring: str = ""
+    signature: str = ""
+    decorators: Tuple[str, ...] = ()
+    parent_class: str = ""
+    route_path: str = ""
+    bases: Tuple[str, ...] = ()
+    language: str = ""
+
+
+def _compact_components(components: Iterable[CodeComponent]):
+    """Intern repeated strings and share one imports tuple per file.
+    
+    Done in the parent process: interning does not survive pickling back
+    from the index workers, and JSON loading gives every component its own
+    copy of the file's imports.
+    """
+    imports_by_file: Dict[str, Tuple[str, ...]] = {}
+    for comp in components:
+        comp.filepath = sys.intern(comp.filepath)
+        comp.type = sys.intern(comp.type)
+        comp.parent_class = sys.intern(comp.parent_class)
+        comp.decorators = tuple(sys.intern(d) for d in comp.decorators)
+        
+        imports = tuple(comp.imports)
+        shared = imports_by_file.setdefault(comp.filepath, imports)
+        comp.imports = shared if shared == imports else imports
+        
+        metadata = comp.metadata
+        if 'language' in metadata:
+            metadata['language'] = sys.intern(metadata['language'])
+        if 'bases' in metadata:
+            metadata['bases'] = tuple(sys.intern(b) for b in metadata['bases'])
+
+
+def _component_to_dict(comp: CodeComponent) -> Dict[str, Any]:
+    """Shallow dict of a component's fields (asdict() deep-copies every list and dict)."""
+    return {name: getattr(comp, name) for name in _COMPONENT_FIELDS}
+
+
+class _PyIndexVisitor(ast.NodeVisitor):
+    """Collect imports, classes, and functions from a module in one pass."""
+    
+    def __init__(self, filepath: str):
+        self.filepath = filepath
+        # Shared by every component in the file; filled in as the walk proceeds
+        self.imports: List[str] = []
+        self.components: List[CodeComponent] = []
+        self._class_stack: List[str] = []
+    
+    def visit_Import(self, node: ast.Import):
+        self.imports.extend([alias.name for alias in node.names])
+    
+    def visit_ImportFrom(self, node: ast.ImportFrom):
+        if node.module:
+            self.imports.append(node.module)
+    
+    def visit_ClassDef(self, node: ast.ClassDef):
+        """Index a class definition, then its methods."""
+        decorators = tuple(_get_decorator_name(dec) for dec in node.decorator_list)
+        
+        component = CodeComponent(
+            type='class',
+            name=node.name,
+            filepath=self.filepath,
+            line_start=node.lineno,
+            line_end=node.end_lineno or node.lineno,
+            docstring=_fast_docstring(node),
+            decorators=decorators,
+            imports=self.imports,
+            metadata={'bases': tuple(_get_name(base) for base in node.bases)}
+        )
+        self.components.append(component)
+        
+        self._class_stack.append(node.name)
+        self.generic_visit(node)
+        self._class_stack.pop()
+    
+    def visit_FunctionDef(self, node: ast.FunctionDef):
+        """Index a function definition."""
+        decorators = tuple(_get_decorator_name(dec) for dec in node.decorator_list)
+        
+        # Build signature
+        args = []
+        for arg in node.args.args:
+            args.append(arg.arg)
+        signature = f"{node.name}({', '.join(args)})"
+        
+        # Check if it's a Flask route
+        is_route = any('route' in dec.lower() for dec in decorators)
+        route_path = _extract_route_path(node)
+        
+        component = CodeComponent(
+            type='route' if is_route else 'function',
+            name=node.name,
+            filepath=self.filepath,
+            line_start=node.lineno,
+            line_end=node.end_lineno or node.lineno,
+            docstring=_fast_docstring(node),
+            signature=signature,
+            decorators=decorators,
+            parent_class=self._class_stack[-1] if self._class_stack else "",
+            imports=self.imports,
+            metadata={'route_path': route_path} if route_path else {}
+        )
+        self.components.append(component)
+        # Nested definitions are not indexed, so the body is never visited
+    
+    def visit_AsyncFunctionDef(self, node: ast.AsyncFunctionDef):
+        """Async functions are not indexed, and neither is anything in their body."""
+
+
+def _index_python_file(args: Tuple[Path, Path]) -> List[CodeComponent]:
+    """Index a Python file."""
+    filepath, project_root = args
+    try:
+        # ast.parse decodes the bytes itself (honoring any coding cookie)
+        data = filepath.read_bytes()
+        tree = ast.parse(data, filename=str(filepath))
+        
+        rel_path = str(filepath.relative_to(project_root))
+        visitor = _PyIndexVisitor(rel_path)
+        
+        # Add file-level component
+        file_component = CodeComponent(
+            type='file',
+            name=filepath.name,
+            filepath=rel_path,
+            line_start=1,
+            line_end=_count_lines(data),
+            docstring=_fast_docstring(tree),
+            imports=visitor.imports,
+            metadata={'language': 'python', 'size': len(data)}
+        )
+        visitor.components.append(file_component)
+        
+        # Imports, classes, and functions in a single traversal
+        visitor.visit(tree)
+        
+        imports = tuple(visitor.imports)
+        for comp in visitor.components:
+            comp.imports = imports
+        return visitor.components
+        
+    except Exception as e:
+        print(f"   ⚠️  Error indexing {filepath}: {e}")
+        return []
+
+
+def display_docstring(docstring: str, language: str = "") -> str:
+    """Docstring as shown to users.
+    
+    Python docstrings are stored raw and cleaned with inspect.cleandoc here;
+    SQL previews and Markdown summaries are shown exactly as stored.
+    """
+    if not docstring or language in ('sql', 'markdown'):
+        return docstring
+    return inspect.cleandoc(docstring)
+
+
+def _fast_docstring(node) -> str:
+    """Raw docstring of a module, class, or function, or "" if it has none.
+    
+    Unlike ast.get_docstring this skips inspect.cleandoc; display_docstring
+    cleans docstrings only when they are shown.
+    """
+    first = node.body[0] if node.body else None
+    if (isinstance(first, ast.Expr) and isinstance(first.value, ast.Constant)
+            and isinstance(first.value.value, str)):
+        return first.value.value
+    return ""
+
+
+def _count_lines(data: bytes) -> int:
+    """Count lines without materializing them; a trailing newline ends the last line."""
+    if not data:
+        return 0
+    return data.count(b'\n') + (0 if data.endswith(b'\n') else 1)
+
+
+def _extract_route_path(node: ast.FunctionDef) -> str:
+    """Extract the route path from Flask decorators."""
+    for dec in node.decorator_list:
+        if isinstance(dec, ast.Call):
+            if hasattr(dec.func, 'attr') and dec.func.attr == 'route':
+                if dec.args and isinstance(dec.args[0], ast.Constant):
+                    return dec.args[0].value
+    return ""
+
+
+def _get_decorator_name(node) -> str:
+    """Get decorator name as string."""
+    if isinstance(node, ast.Name):
+        return node.id
+    elif isinstance(node, ast.Attribute):
+        return f"{_get_name(node.value)}.{node.attr}"
+    elif isinstance(node, ast.Call):
+        return _get_decorator_name(node.func)
+    return str(node)
+
+
+def _get_name(node) -> str:
+    """Get name from AST node."""
+    if isinstance(node, ast.Name):
+        return node.id
+    elif isinstance(node, ast.Attribute):
+        return f"{_get_name(node.value)}.{node.attr}"
+    return str(node)
+
+
+def _lower(text: str) -> str:
+    """Lowercase text, reusing the original string when it is already lowercase."""
+    return text if text.islower() or not text else text.lower()
+
+
+# Every score search() can assign, best first
+_SCORE_TIERS = (100, 50, 30, 20, 15, 10)
+
+_PACK_SEP = '\x00'
+
+
+def _pack(records: Iterable[Tuple[str, ...]]) -> Tuple[str, array]:
+    """Join every field of every record into one NUL-separated buffer.
+    
+    Returns the buffer plus each record's start offset. A needle without
+    NUL can never match across two fields.
+    """
+    offsets = array('I')
+    parts: List[str] = []
+    pos = 0
+    for record in records:
+        offsets.append(pos)
+        for text in record:
+            parts.append(text)
+            pos += len(text) + 1
+    return _PACK_SEP.join(parts), offsets
+
+
+def _scan_packed(buffer: str, offsets: array, needle: str) -> List[int]:
+    """Indices of the packed records containing needle, in ascending order.
+    
+    str.find does the scanning in C; after each match the search resumes at
+    the next record, so the Python loop runs once per matching record.
+    """
+    hits: List[int] = []
+    find = buffer.find
+    last = len(offsets) - 1
+    pos = find(needle)
+    while pos != -1:
+        i = bisect_right(offsets, pos) - 1
+        hits.append(i)
+        if i == last:
+            break
+        pos = find(needle, offsets[i + 1])
+    return hits
+
+
+def _index_sql_file(args: Tuple[Path, Path]) -> List[CodeComponent]:
+    """Index a SQL file, extracting table names and structure."""
+    filepath, project_root = args
+    components: List[CodeComponent] = []
+    try:
+        content = filepath.read_text(encoding='utf-8')
+        rel_path = str(filepath.relative_to(project_root))
+        
+        # Add file component; its content is moved to the indexer's content store
+        file_component = CodeComponent(
+            type='file',
+            name=filepath.name,
+            filepath=rel_path,
+            line_start=1,
+            line_end=len(content.splitlines()),
+            docstring=content[:500],  # First 500 chars as preview
+            metadata={'language': 'sql', 'size': len(content), 'content': content}
+        )
+        components.append(file_component)
+        
+        # Extract table names from CREATE TABLE statements
+        for match in _CREATE_TABLE_RE.finditer(content):
+            table_name = match.group(1)
+            line_num = content[:match.start()].count('\n') + 1
+            
+            # Find the end of the CREATE TABLE statement
+            end_pos = content.find(';', match.start())
+            if end_pos == -1:
+                end_pos = len(content)
+            end_line = content[:end_pos].count('\n') + 1
+            
+            component = CodeComponent(
+                type='table',
+                name=table_name,
+                filepath=rel_path,
+                line_start=line_num,
+                line_end=end_line,
+                metadata={'language': 'sql'}
+            )
+            components.append(component)
+            
+    except Exception as e:
+        print(f"   ⚠️  Error indexing {filepath}: {e}")
+    return components
+
+
+def _index_markdown_file(args: Tuple[Path, Path]) -> List[CodeComponent]:
+    """Index a Markdown documentation file."""
+    filepath, project_root = args
+    components: List[CodeComponent] = []
+    try:
+        content = filepath.read_text(encoding='utf-8')
+        rel_path = str(filepath.relative_to(project_root))
+        
+        # Extract title (first # heading)
+        title_match = _MD_TITLE_RE.search(content)
+        title = title_match.group(1) if title_match else filepath.stem
+        
+        # Extract first paragraph as summary
+        lines = content.split('\n')
+        summary_lines = []
+        for line in lines:
+            if line.strip() and not line.startswith('#'):
+                summary_lines.append(line.strip())
+                if len(summary_lines) >= 3:
+                    break
+        summary = ' '.join(summary_lines)[:200]
+        
+        component = CodeComponent(
+            type='file',
+            name=filepath.name,
+            filepath=rel_path,
+            line_start=1,
+            line_end=len(lines),
+            docstring=summary,
+            metadata={
+                'language': 'markdown',
+                'title': title,
+                'size': len(content),
+                'content': content  # Moved to the indexer's content store
+            }
+        )
+        components.append(component)
+        
+    except Exception as e:
+        print(f"   ⚠️  Error indexing {filepath}: {e}")
+    return components
+
+
+def _content_path(index_path: Path) -> Path:
+    """Side file holding the SQL/Markdown content store for an index file."""
+    return index_path.with_name(index_path.stem + '_content.jsonl')
+
+
+def _dumps(obj: Any, indent: bool = False) -> bytes:
+    """Serialize to JSON bytes, using orjson when it is installed.
+    
+    orjson refuses strings holding lone surrogates, which valid source can
+    contain (e.g. a "\\ud800" escape in a docstring); those fall back to the
+    stdlib, which writes them as escapes.
+    """
+    if orjson is not None:
+        try:
+            return orjson.dumps(obj, option=orjson.OPT_INDENT_2 if indent else None)
+        except orjson.JSONEncodeError:
+            pass
+    return json.dumps(obj, indent=2 if indent else None).encode('utf-8')
+
+
+def _loads(data: bytes) -> Any:
+    """Parse JSON bytes, using orjson when it is installed.
+    
+    orjson also rejects the lone-surrogate escapes that _dumps falls back
+    to writing, so those are parsed with the stdlib.
+    """
+    if orjson is not None:
+        try:
+            return orjson.loads(data)
+        except orjson.JSONDecodeError:
+            pass
+    return json.loads(data)
+
+
+def _read_index_json(index_path: Path) -> Dict[str, Any]:
+    """Parse a saved index file."""
+    return _loads(index_path.read_bytes())
+
+
+def _read_content_store(index_path: Path) -> Dict[str, str]:
+    """Read the content side file of an index, if it has one."""
+    path = _content_path(index_path)
+    if not path.exists():
+        return {}
+    store = {}
+    with path.open('rb') as f:
+        for line in f:
+            record = _loads(line)
+            store[record['filepath']] = record['content']
+    return store
+
+
+def _move_inline_content(components: Iterable[CodeComponent], store: Dict[str, str]):
+    """Move metadata['content'] into store, leaving a content_key behind.
+    
+    Applies to freshly parsed SQL/Markdown files and to indexes saved
+    before content moved out of the main index file.
+    """
+    for comp in components:
+        metadata = comp.metadata
+        if 'content' in metadata:
+            store[comp.filepath] = metadata.pop('content')
+            metadata['content_key'] = comp.filepath
+
+
+def _concat(chunks: List[list]) -> list:
+    """Concatenate lists into one list allocated at its final size."""
+    out = [None] * sum(map(len, chunks))
+    pos = 0
+    for chunk in chunks:
+        end = pos + len(chunk)
+        out[pos:end] = chunk
+        pos = end
+    return out
+
+
+def _classify(components: List[CodeComponent]) -> Dict[str, dict]:
+    """Bucket components into the indexer's lookup tables."""
+    lookup = {'routes': {}, 'models': {}, 'tables': {}, 'functions': {}, 'classes': {}}
+    for comp in components:
+        if comp.type == 'route':
+            route_path = comp.metadata.get('route_path', comp.name)
+            lookup['routes'][route_path] = comp
+        elif comp.type == 'model' or (comp.type == 'class' and 
+                                      any('Model' in base for base in comp.metadata.get('bases', []))):
+            lookup['models'][comp.name] = comp
+            comp.type = 'model'  # Update type
+        elif comp.type == 'table':
+            lookup['tables'][comp.name] = comp
+        elif comp.type == 'function':
+            lookup['functions'].setdefault(comp.name, []).append(comp)
+        elif comp.type == 'class':
+            lookup['classes'][comp.name] = comp
+    return lookup
+
+
+def _index_and_classify(job) -> Tuple[List[CodeComponent], Dict[str, dict]]:
+    """Run a per-file indexer and bucket its components, all inside the worker."""
+    worker, filepath, project_root = job
+    components = worker((filepath, project_root))
+    return components, _classify(components)
+
+
 class CodebaseIndexer:
     """Index the codebase for fast searching."""
     
@@ -48,6 +529,15 @@ class CodebaseIndexer:
         '*.pyc', '*.pyo', '*.so', '*.dylib', '.DS_Store', '*.egg-info'
     }
     
+    # File extension -> kind; extensionless files named "py" etc. do not match
+    SOURCE_KINDS = {'.py': 'py', '.sql': 'sql', '.md': 'md'}
+    
+    # Files handed to each worker process per round-trip
+    CHUNKSIZE = 10
+    
+    # Bump whenever parsing output changes, so saved indexes are not reused
+    INDEX_VERSION = 1
+    
     def __init__(self, project_root: Path):
         self.project_root = Path(project_root)
         self.components: List[CodeComponent] = []
@@ -57,6 +547,27 @@ class CodebaseIndexer:
         self.tables: Dict[str, CodeComponent] = {}
         self.functions: Dict[str, List[CodeComponent]] = {}
         self.classes: Dict[str, CodeComponent] = {}
+        # rel_path -> components of that file, and its 'file' component if any
+        self.by_file: Dict[str, List[CodeComponent]] = {}
+        self.file_components: Dict[str, CodeComponent] = {}
+        # 'route' / 'model' / 'table' / 'class' -> that table's components sorted by name
+        self.sorted_by_type: Dict[str, Tuple[CodeComponent, ...]] = {}
+        # rel_path -> {'mtime_ns', 'size'} of each file when it was indexed
+        self.manifest: Dict[str, Dict[str, int]] = {}
+        # Full SQL/Markdown file text, referenced by metadata['content_key']
+        self.content_store: Dict[str, str] = {}
+        # Pre-lowercased search fields, parallel to self.components
+        self._types: List[str] = []
+        self._names_lower: List[str] = []
+        self._docstrings_lower: List[str] = []
+        self._filepaths_lower: List[str] = []
+        self._languages: List[str] = []
+        self._titles_lower: List[str] = []
+        self._contents_lower: List[str] = []
+        # trigram -> ascending component indices; built with the search arrays
+        self._trigram_index: Dict[str, array] = {}
+        # All search fields packed into one (buffer, per-component offsets) pair, for short queries
+        self._packed_corpus: Tuple[str, array] = ('', array('I'))
         
     def should_index_path(self, path: Path) -> bool:
         """Check if a path should be indexed."""
@@ -72,45 +583,48 @@ class CodebaseIndexer:
         
         return True
     
-    def index_codebase(self) -> Dict[str, Any]:
-        """Index the entire codebase."""
+    def index_codebase(self, cache_path: Path = None) -> Dict[str, Any]:
+        """Index the entire codebase.
+        
+        If cache_path points at a previously saved index, files whose mtime
+        and size are unchanged reuse their cached components instead of
+        being parsed again.
+        """
         print(f"🔍 Indexing codebase at {self.project_root}")
-        start_time = datetime.now()
+        start = time.perf_counter_ns()
         
-        # Index Python files
-        python_files = [
-            f for f in self.project_root.rglob('*.py')
-            if self.should_index_path(f)
-        ]
+        previous_manifest, previous_components, previous_content = self._load_previous(cache_path)
         
-        print(f"   Found {len(python_files)} Python files")
-        for py_file in python_files:
-            self._index_python_file(py_file)
+        python_files: List[Path] = []
+        sql_files: List[Path] = []
+        md_files: List[Path] = []
+        by_kind = {'py': python_files, 'sql': sql_files, 'md': md_files}
+        for path, kind in self._walk_sources():
+            by_kind[kind].append(path)
         
-        # Index SQL files
-        sql_files = [
-            f for f in self.project_root.rglob('*.sql')
-            if self.should_index_path(f)
-        ]
+        # All kinds go through one pool map, so SQL and Markdown files are
+        # parsed alongside the Python files instead of after them
+        jobs: List[Tuple[Any, Path]] = []
+        for label, worker, files in (
+            ('Python', _index_python_file, python_files),
+            ('SQL', _index_sql_file, sql_files),
+            ('Markdown', _index_markdown_file, md_files),
+        ):
+            print(f"   Found {len(files)} {label} files")
+            jobs.extend((worker, filepath) for filepath in files)
         
-        print(f"   Found {len(sql_files)} SQL files")
-        for sql_file in sql_files:
-            self._index_sql_file(sql_file)
+        chunks: List[List[CodeComponent]] = [self.components]
+        chunks.extend(self._index_files(jobs, previous_manifest, previous_components, previous_content))
+        self.components = _concat(chunks)
         
-        # Index Markdown documentation
-        md_files = [
-            f for f in self.project_root.rglob('*.md')
-            if self.should_index_path(f) and not f.name.startswith('.')
-        ]
-        
-        print(f"   Found {len(md_files)} Markdown files")
-        for md_file in md_files:
-            self._index_markdown_file(md_file)
+        _compact_components(self.components)
         
-        # Build lookup tables
-        self._build_lookup_tables()
+        # Lookup tables were merged per file above; only the derived tables remain
+        self._build_file_tables()
+        self._build_sorted_tables()
+        self._build_search_arrays()
         
-        elapsed = (datetime.now() - start_time).total_seconds()
+        elapsed = (time.perf_counter_ns() - start) / 1e9
         stats = {
             'total_components': len(self.components),
             'files_indexed': len(self.files_indexed),
@@ -125,280 +639,305 @@ class CodebaseIndexer:
         print(f"✅ Indexed {stats['total_components']} components in {elapsed:.2f}s")
         return stats
     
-    def _index_python_file(self, filepath: Path):
-        """Index a Python file."""
-        try:
-            content = filepath.read_text(encoding='utf-8')
-            tree = ast.parse(content, filename=str(filepath))
-            
-            rel_path = str(filepath.relative_to(self.project_root))
-            self.files_indexed.add(rel_path)
-            
-            # Extract imports
-            imports = []
-            for node in ast.walk(tree):
-                if isinstance(node, ast.Import):
-                    imports.extend([alias.name for alias in node.names])
-                elif isinstance(node, ast.ImportFrom):
-                    if node.module:
-                        imports.append(node.module)
-            
-            # Add file-level component
-            file_component = CodeComponent(
-                type='file',
-                name=filepath.name,
-                filepath=rel_path,
-                line_start=1,
-                line_end=len(content.splitlines()),
-                docstring=ast.get_docstring(tree) or "",
-                imports=imports,
-                metadata={'language': 'python', 'size': len(content)}
-            )
-            self.components.append(file_component)
-            
-            # Parse classes and functions
-            for node in ast.walk(tree):
-                if isinstance(node, ast.ClassDef):
-                    self._index_class(node, rel_path, imports)
-                elif isinstance(node, ast.FunctionDef):
-                    self._index_function(node, rel_path, imports)
-                    
-        except Exception as e:
-            print(f"   ⚠️  Error indexing {filepath}: {e}")
-    
-    def _index_class(self, node: ast.ClassDef, filepath: str, imports: List[str]):
-        """Index a class definition."""
-        decorators = [self._get_decorator_name(dec) for dec in node.decorator_list]
-        
-        component = CodeComponent(
-            type='class',
-            name=node.name,
-            filepath=filepath,
-            line_start=node.lineno,
-            line_end=node.end_lineno or node.lineno,
-            docstring=ast.get_docstring(node) or "",
-            decorators=decorators,
-            imports=imports,
-            metadata={'bases': [self._get_name(base) for base in node.bases]}
-        )
-        self.components.append(component)
-        
-        # Index methods
-        for item in node.body:
-            if isinstance(item, ast.FunctionDef):
-                self._index_function(item, filepath, imports, parent_class=node.name)
+    def _is_excluded_name(self, name: str) -> bool:
+        """Check a file or directory name against EXCLUDE_PATTERNS."""
+        return any(fnmatch(name, pattern) for pattern in self.EXCLUDE_PATTERNS)
     
-    def _index_function(self, node: ast.FunctionDef, filepath: str, 
-                       imports: List[str], parent_class: str = ""):
-        """Index a function definition."""
-        decorators = [self._get_decorator_name(dec) for dec in node.decorator_list]
+    def _walk_sources(self):
+        """Yield (path, kind) for each indexable file in a single pruned tree walk."""
+        for root, dirs, files in os.walk(self.project_root):
+            # Prune in place so excluded subtrees are never descended into
+            dirs[:] = [
+                d for d in dirs
+                if d not in self.EXCLUDE_DIRS and not self._is_excluded_name(d)
+            ]
+            for name in files:
+                kind = self.SOURCE_KINDS.get(os.path.splitext(name)[1])
+                if kind is None or self._is_excluded_name(name):
+                    continue
+                if kind == 'md' and name.startswith('.'):
+                    continue
+                yield Path(root) / name, kind
+    
+    def _load_previous(self, cache_path: Path = None):
+        """Load the manifest, per-file components, and content store of a saved index."""
+        if cache_path is None or not cache_path.exists():
+            return {}, {}, {}
         
-        # Build signature
-        args = []
-        for arg in node.args.args:
-            args.append(arg.arg)
-        signature = f"{node.name}({', '.join(args)})"
+        data = _read_index_json(cache_path)
+        # Reused entries are only valid for the same tree and index format
+        if (data.get('index_version') != self.INDEX_VERSION
+                or data.get('project_root') != str(self.project_root.resolve())):
+            print(f"   Ignoring {cache_path}: built for another project or index version")
+            return {}, {}, {}
         
-        # Check if it's a Flask route
-        is_route = any('route' in dec.lower() for dec in decorators)
-        route_path = self._extract_route_path(node)
+        components = [CodeComponent(**comp) for comp in data['components']]
+        _compact_components(components)
         
-        component = CodeComponent(
-            type='route' if is_route else 'function',
-            name=node.name,
-            filepath=filepath,
-            line_start=node.lineno,
-            line_end=node.end_lineno or node.lineno,
-            docstring=ast.get_docstring(node) or "",
-            signature=signature,
-            decorators=decorators,
-            parent_class=parent_class,
-            imports=imports,
-            metadata={'route_path': route_path} if route_path else {}
-        )
-        self.components.append(component)
+        components_by_file: Dict[str, List[CodeComponent]] = {}
+        for comp in components:
+            components_by_file.setdefault(comp.filepath, []).append(comp)
+        
+        content = _read_content_store(cache_path)
+        _move_inline_content(components, content)
+        return data.get('manifest', {}), components_by_file, content
     
-    def _extract_route_path(self, node: ast.FunctionDef) -> str:
-        """Extract the route path from Flask decorators."""
-        for dec in node.decorator_list:
-            if isinstance(dec, ast.Call):
-                if hasattr(dec.func, 'attr') and dec.func.attr == 'route':
-                    if dec.args and isinstance(dec.args[0], ast.Constant):
-                        return dec.args[0].value
-        return ""
-    
-    def _get_decorator_name(self, node) -> str:
-        """Get decorator name as string."""
-        if isinstance(node, ast.Name):
-            return node.id
-        elif isinstance(node, ast.Attribute):
-            return f"{self._get_name(node.value)}.{node.attr}"
-        elif isinstance(node, ast.Call):
-            return self._get_decorator_name(node.func)
-        return str(node)
-    
-    def _get_name(self, node) -> str:
-        """Get name from AST node."""
-        if isinstance(node, ast.Name):
-            return node.id
-        elif isinstance(node, ast.Attribute):
-            return f"{self._get_name(node.value)}.{node.attr}"
-        return str(node)
-    
-    def _index_sql_file(self, filepath: Path):
-        """Index a SQL file, extracting table names and structure."""
-        try:
-            content = filepath.read_text(encoding='utf-8')
-            rel_path = str(filepath.relative_to(self.project_root))
-            self.files_indexed.add(rel_path)
-            
-            # Add file component with content for search
-            file_component = CodeComponent(
-                type='file',
-                name=filepath.name,
-                filepath=rel_path,
-                line_start=1,
-                line_end=len(content.splitlines()),
-                docstring=content[:500],  # First 500 chars as preview
-                metadata={'language': 'sql', 'size': len(content), 'content': content}
-            )
-            self.components.append(file_component)
-            
-            # Extract table names from CREATE TABLE statements
-            create_table_pattern = r'CREATE\s+TABLE\s+(?:IF\s+NOT\s+EXISTS\s+)?([a-z_][a-z0-9_]*)'
-            for match in re.finditer(create_table_pattern, content, re.IGNORECASE):
-                table_name = match.group(1)
-                line_num = content[:match.start()].count('\n') + 1
-                
-                # Find the end of the CREATE TABLE statement
-                end_pos = content.find(';', match.start())
-                if end_pos == -1:
-                    end_pos = len(content)
-                end_line = content[:end_pos].count('\n') + 1
-                
-                component = CodeComponent(
-                    type='table',
-                    name=table_name,
-                    filepath=rel_path,
-                    line_start=line_num,
-                    line_end=end_line,
-                    metadata={'language': 'sql'}
-                )
-                self.components.append(component)
-                
-        except Exception as e:
-            print(f"   ⚠️  Error indexing {filepath}: {e}")
-    
-    def _index_markdown_file(self, filepath: Path):
-        """Index a Markdown documentation file."""
-        try:
-            content = filepath.read_text(encoding='utf-8')
+    def _index_files(self, files: List[Tuple[Any, Path]],
+                     previous_manifest: Dict[str, Dict[str, int]],
+                     previous_components: Dict[str, List[CodeComponent]],
+                     previous_content: Dict[str, str]) -> List[List[CodeComponent]]:
+        """Index (worker, filepath) pairs, reusing cached components for unchanged files.
+        
+        Parsing is CPU-bound and independent per file, so stale files are
+        fanned out across processes. Lookup tables are merged here; the
+        per-file component lists are returned, in input order, for the
+        caller to concatenate.
+        """
+        results: List[Tuple[List[CodeComponent], Dict[str, dict]]] = []
+        stale: List[Tuple[int, Any, Path]] = []
+        
+        for worker, filepath in files:
             rel_path = str(filepath.relative_to(self.project_root))
-            self.files_indexed.add(rel_path)
-            
-            # Extract title (first # heading)
-            title_match = re.search(r'^#\s+(.+)$', content, re.MULTILINE)
-            title = title_match.group(1) if title_match else filepath.stem
-            
-            # Extract first paragraph as summary
-            lines = content.split('\n')
-            summary_lines = []
-            for line in lines:
-                if line.strip() and not line.startswith('#'):
-                    summary_lines.append(line.strip())
-                    if len(summary_lines) >= 3:
-                        break
-            summary = ' '.join(summary_lines)[:200]
-            
-            component = CodeComponent(
-                type='file',
-                name=filepath.name,
-                filepath=rel_path,
-                line_start=1,
-                line_end=len(lines),
-                docstring=summary,
-                metadata={
-                    'language': 'markdown',
-                    'title': title,
-                    'size': len(content),
-                    'content': content  # Store full content for search
-                }
-            )
-            self.components.append(component)
+            # Dangling symlinks and files removed since the walk are skipped
+            try:
+                st = filepath.stat()
+            except OSError as e:
+                print(f"   ⚠️  Error indexing {filepath}: {e}")
+                continue
+            entry = {'mtime_ns': st.st_mtime_ns, 'size': st.st_size}
+            self.manifest[rel_path] = entry
             
-        except Exception as e:
-            print(f"   ⚠️  Error indexing {filepath}: {e}")
+            cached = previous_components.get(rel_path, [])
+            # A file whose content is missing from the side file is parsed again
+            if previous_manifest.get(rel_path) == entry and all(
+                comp.metadata['content_key'] in previous_content
+                for comp in cached if 'content_key' in comp.metadata
+            ):
+                results.append((cached, _classify(cached)))
+            else:
+                stale.append((len(results), worker, filepath))
+                results.append(None)
+        
+        # One worker per CHUNKSIZE stale files, capped at the CPU count; a
+        # small incremental run parses inline instead of forking a pool
+        jobs = [(worker, filepath, self.project_root) for _, worker, filepath in stale]
+        workers = min(os.cpu_count() or 1, (len(jobs) + self.CHUNKSIZE - 1) // self.CHUNKSIZE)
+        if workers > 1:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                parsed = list(executor.map(_index_and_classify, jobs, chunksize=self.CHUNKSIZE))
+        else:
+            parsed = [_index_and_classify(job) for job in jobs]
+        for (i, _, _), result in zip(stale, parsed):
+            results[i] = result
+        
+        if files:
+            print(f"      {len(stale)} parsed, {len(results) - len(stale)} unchanged")
+        
+        for file_components, lookup in results:
+            for comp in file_components:
+                if comp.type == 'file':
+                    self.files_indexed.add(comp.filepath)
+                # Cached components already point into the previous content store
+                key = comp.metadata.get('content_key')
+                if key is not None:
+                    self.content_store[key] = previous_content[key]
+            _move_inline_content(file_components, self.content_store)
+            self._merge_lookup(lookup)
+        return [file_components for file_components, _ in results]
+    
+    def _merge_lookup(self, lookup: Dict[str, dict]):
+        """Fold one batch of bucketed components into the lookup tables."""
+        self.routes.update(lookup['routes'])
+        self.models.update(lookup['models'])
+        self.tables.update(lookup['tables'])
+        self.classes.update(lookup['classes'])
+        for name, funcs in lookup['functions'].items():
+            self.functions.setdefault(name, []).extend(funcs)
     
     def _build_lookup_tables(self):
         """Build fast lookup dictionaries."""
+        self._merge_lookup(_classify(self.components))
+        self._build_file_tables()
+        self._build_sorted_tables()
+        self._build_search_arrays()
+    
+    def _build_file_tables(self):
+        """Group components by file so per-file lookups are a single dict access."""
+        by_file: Dict[str, List[CodeComponent]] = {}
+        file_components: Dict[str, CodeComponent] = {}
+        for comp in self.components:
+            by_file.setdefault(comp.filepath, []).append(comp)
+            if comp.type == 'file' and comp.filepath not in file_components:
+                file_components[comp.filepath] = comp
+        self.by_file = by_file
+        self.file_components = file_components
+    
+    def _build_sorted_tables(self):
+        """Sort each named lookup table once instead of on every listing."""
+        self.sorted_by_type = {
+            'route': tuple(sorted(self.routes.values(), key=_NAME_KEY)),
+            'model': tuple(sorted(self.models.values(), key=_NAME_KEY)),
+            'table': tuple(sorted(self.tables.values(), key=_NAME_KEY)),
+            'class': tuple(sorted(self.classes.values(), key=_NAME_KEY)),
+        }
+    
+    def _build_search_arrays(self):
+        """Lay out the searchable fields as parallel, pre-lowercased arrays."""
+        # Every component in a file shares one lowercased path
+        filepaths_lower: Dict[str, str] = {}
         for comp in self.components:
-            if comp.type == 'route':
-                route_path = comp.metadata.get('route_path', comp.name)
-                self.routes[route_path] = comp
-            elif comp.type == 'model' or (comp.type == 'class' and 
-                                          any('Model' in base for base in comp.metadata.get('bases', []))):
-                self.models[comp.name] = comp
-                comp.type = 'model'  # Update type
-            elif comp.type == 'table':
-                self.tables[comp.name] = comp
-            elif comp.type == 'function':
-                if comp.name not in self.functions:
-                    self.functions[comp.name] = []
-                self.functions[comp.name].append(comp)
-            elif comp.type == 'class':
-                self.classes[comp.name] = comp
-    
-    def search(self, query: str, component_type: str = None, limit: int = 20) -> List[Dict[str, Any]]:
+            if comp.filepath not in filepaths_lower:
+                filepaths_lower[comp.filepath] = _lower(comp.filepath)
+        
+        self._types = [comp.type for comp in self.components]
+        self._names_lower = [_lower(comp.name) for comp in self.components]
+        self._docstrings_lower = [_lower(comp.docstring) for comp in self.components]
+        self._filepaths_lower = [filepaths_lower[comp.filepath] for comp in self.components]
+        self._languages = [comp.metadata.get('language', '') for comp in self.components]
+        self._titles_lower = [_lower(comp.metadata.get('title', '')) for comp in self.components]
+        store = self.content_store
+        self._contents_lower = [
+            _lower(store.get(comp.metadata['content_key'], '')) if 'content_key' in comp.metadata else ''
+            for comp in self.components
+        ]
+        self._build_trigram_index()
+        self._packed_corpus = _pack(zip(
+            self._names_lower, self._docstrings_lower, self._filepaths_lower,
+            self._titles_lower, self._contents_lower,
+        ))
+    
+    def _build_trigram_index(self):
+        """Map every trigram of the searchable fields to the components containing it."""
+        postings: Dict[str, array] = {}
+        records = zip(self._names_lower, self._docstrings_lower, self._filepaths_lower,
+                      self._titles_lower, self._contents_lower)
+        for i, texts in enumerate(records):
+            grams = set()
+            for text in texts:
+                grams.update(text[j:j + 3] for j in range(len(text) - 2))
+            for gram in grams:
+                posting = postings.get(gram)
+                if posting is None:
+                    posting = postings[gram] = array('I')
+                posting.append(i)
+        self._trigram_index = postings
+    
+    def _candidates(self, query_lower: str):
+        """Indices of components that may contain the query, or None to scan them all."""
+        if not query_lower or _PACK_SEP in query_lower:
+            return None
+        if len(query_lower) < 3:
+            return self._scan_candidates(query_lower)
+        
+        # A substring match requires every trigram of the query to be present
+        postings = []
+        for gram in {query_lower[j:j + 3] for j in range(len(query_lower) - 2)}:
+            posting = self._trigram_index.get(gram)
+            if posting is None:
+                return []
+            postings.append(posting)
+        
+        postings.sort(key=len)
+        candidates = set(postings[0])
+        for posting in postings[1:]:
+            candidates.intersection_update(posting)
+            if not candidates:
+                break
+        return sorted(candidates)
+    
+    def _scan_candidates(self, query_lower: str) -> List[int]:
+        """Indices of components containing a query too short for the trigram index."""
+        # One pass over the whole corpus; hits arrive in component order
+        buffer, offsets = self._packed_corpus
+        return _scan_packed(buffer, offsets, query_lower)
+    
+    def search(self, query: str, component_type: str = None, limit: int = 20) -> List[SearchHit]:
         """Search the codebase."""
         query_lower = query.lower()
-        results = []
+        types = self._types
+        names = self._names_lower
+        docstrings = self._docstrings_lower
+        filepaths = self._filepaths_lower
+        languages = self._languages
+        titles = self._titles_lower
+        contents = self._contents_lower
+        # Scores take only a few fixed values, so rank by bucketing instead of sorting
+        tiers: Dict[int, List[int]] = {score: [] for score in _SCORE_TIERS}
         
-        for comp in self.components:
-            if component_type and comp.type != component_type:
+        indices = self._candidates(query_lower)
+        if indices is None:
+            indices = range(len(types))
+        
+        for i in indices:
+            if component_type and types[i] != component_type:
                 continue
             
-            score = 0
-            
+            name = names[i]
             # Exact name match
-            if query_lower == comp.name.lower():
-                score += 100
+            if query_lower == name:
+                score = 100
             # Name contains query
-            elif query_lower in comp.name.lower():
-                score += 50
+            elif query_lower in name:
+                score = 50
             # Docstring contains query
-            elif query_lower in comp.docstring.lower():
-                score += 20
+            elif query_lower in docstrings[i]:
+                score = 20
             # Filepath contains query
-            elif query_lower in comp.filepath.lower():
-                score += 10
+            elif query_lower in filepaths[i]:
+                score = 10
             # For markdown files, search title and content
-            elif comp.metadata and comp.metadata.get('language') == 'markdown':
-                if query_lower in comp.metadata.get('title', '').lower():
-                    score += 30
-                elif query_lower in comp.metadata.get('content', '').lower():
-                    score += 15
+            elif languages[i] == 'markdown':
+                if query_lower in titles[i]:
+                    score = 30
+                elif query_lower in contents[i]:
+                    score = 15
+                else:
+                    continue
             # For SQL files, search content
-            elif comp.metadata and comp.metadata.get('language') == 'sql':
-                if query_lower in comp.metadata.get('content', '').lower():
-                    score += 15
+            elif languages[i] == 'sql' and query_lower in contents[i]:
+                score = 15
+            else:
+                continue
             
-            if score > 0:
-                result = asdict(comp)
-                result['score'] = score
-                results.append(result)
+            tiers[score].append(i)
         
-        # Sort by score descending
-        results.sort(key=lambda x: x['score'], reverse=True)
-        return results[:limit]
+        # Walk the tiers best-first (index order within a tier, as a stable sort
+        # would give) and build hits only for the results returned
+        components = self.components
+        results: List[SearchHit] = []
+        for score in _SCORE_TIERS:
+            for i in tiers[score]:
+                if len(results) >= limit:
+                    return results
+                comp = components[i]
+                metadata = comp.metadata
+                results.append(SearchHit(
+                    type=comp.type,
+                    name=comp.name,
+                    filepath=comp.filepath,
+                    line_start=comp.line_start,
+                    line_end=comp.line_end,
+                    score=score,
+                    docstring=comp.docstring,
+                    signature=comp.signature,
+                    decorators=comp.decorators,
+                    parent_class=comp.parent_class,
+                    route_path=metadata.get('route_path', ''),
+                    bases=metadata.get('bases', ()),
+                    language=metadata.get('language', ''),
+                ))
+        return results
     
     def save_index(self, output_path: Path):
-        """Save the index to a JSON file."""
+        """Save the index to a JSON file, with file content in a JSON Lines side file."""
         output_path.parent.mkdir(parents=True, exist_ok=True)
         
         data = {
+            'index_version': self.INDEX_VERSION,
             'indexed_at': datetime.now().isoformat(),
-            'project_root': str(self.project_root),
-            'components': [asdict(comp) for comp in self.components],
+            'project_root': str(self.project_root.resolve()),
+            'components': [_component_to_dict(comp) for comp in self.components],
+            'manifest': self.manifest,
             'stats': {
                 'total_components': len(self.components),
                 'files_indexed': len(self.files_indexed),
@@ -410,21 +949,30 @@ class CodebaseIndexer:
             }
         }
         
-        with output_path.open('w', encoding='utf-8') as f:
-            json.dump(data, f, indent=2)
+        output_path.write_bytes(_dumps(data, indent=True))
+        
+        # One compact line per file keeps large content out of the pretty-printed index
+        with _content_path(output_path).open('wb') as f:
+            for filepath, content in self.content_store.items():
+                f.write(_dumps({'filepath': filepath, 'content': content}))
+                f.write(b'\n')
         
         print(f"💾 Saved index to {output_path}")
     
     @classmethod
     def load_index(cls, index_path: Path, project_root: Path) -> 'CodebaseIndexer':
         """Load an index from a JSON file."""
-        with index_path.open('r', encoding='utf-8') as f:
-            data = json.load(f)
+        data = _read_index_json(index_path)
         
         indexer = cls(project_root)
         indexer.components = [
             CodeComponent(**comp) for comp in data['components']
         ]
+        _compact_components(indexer.components)
+        indexer.manifest = data.get('manifest', {})
+        # Read together with the index so both come from the same snapshot
+        indexer.content_store = _read_content_store(index_path)
+        _move_inline_content(indexer.components, indexer.content_store)
         indexer._build_lookup_tables()
         
         print(f"📂 Loaded index from {index_path}")
@@ -443,21 +991,23 @@ def main():
                        default=Path(__file__).parent / 'codebase_index.json',
                        help='Output JSON file')
     parser.add_argument('--search', type=str, help='Search after indexing')
+    parser.add_argument('--full', action='store_true',
+                       help='Re-parse every file instead of reusing unchanged ones from --output')
     
     args = parser.parse_args()
     
     indexer = CodebaseIndexer(args.project_root)
-    indexer.index_codebase()
+    indexer.index_codebase(cache_path=None if args.full else args.output)
     indexer.save_index(args.output)
     
     if args.search:
         print(f"\n🔎 Searching for: {args.search}")
         results = indexer.search(args.search, limit=10)
         for i, result in enumerate(results, 1):
-            print(f"\n{i}. {result['type']}: {result['name']}")
-            print(f"   📄 {result['filepath']}:{result['line_start']}")
-            if result['docstring']:
-                print(f"   📝 {result['docstring'][:80]}...")
+            print(f"\n{i}. {result.type}: {result.name}")
+            print(f"   📄 {result.filepath}:{result.line_start}")
+            if result.docstring:
+                print(f"   📝 {display_docstring(result.docstring, result.language)[:80]}...")
 
 
 if __name__ == '__main__':
@@ -7,36 +7,62 @@ Tools: search_code, find_route, find_model, find_table, list_components, explain
 """
 
 import asyncio
+import functools
+import heapq
+import io
 import json
+from collections import defaultdict
+from operator import attrgetter
 from pathlib import Path
-from typing import Any, Sequence
+from typing import Any, Awaitable, Callable, Sequence
 
 from mcp.server import Server
 from mcp.server.stdio import stdio_server
 from mcp.types import Tool, TextContent
 
-from indexer import CodebaseIndexer
+from indexer import CodebaseIndexer, display_docstring
 
 
 # Initialize
 PROJECT_ROOT = Path(__file__).parent.parent.parent
 INDEX_PATH = Path(__file__).parent / 'codebase_index.json'
 
-# Global indexer (lazy loaded)
 _indexer: CodebaseIndexer | None = None
+_indexer_lock = asyncio.Lock()
 
 
-def get_indexer() -> CodebaseIndexer:
-    """Get or load the codebase indexer."""
+def _load_or_build() -> CodebaseIndexer:
+    """Load the saved index, or build and save it on first run (blocking)."""
+    if INDEX_PATH.exists():
+        return CodebaseIndexer.load_index(INDEX_PATH, PROJECT_ROOT)
+    
+    # Build index on first run
+    return _rebuild()
+
+
+def _rebuild() -> CodebaseIndexer:
+    """Index the whole codebase and save it over the saved index (blocking).
+    
+    The saved index is only replaced once the new one is built, so a
+    failed rebuild leaves both it and the in-memory indexer untouched.
+    """
+    indexer = CodebaseIndexer(PROJECT_ROOT)
+    indexer.index_codebase()
+    indexer.save_index(INDEX_PATH)
+    return indexer
+
+
+async def get_indexer() -> CodebaseIndexer:
+    """Get or load the codebase indexer (lazy loaded once, then cached).
+    
+    Loading parses the saved index or indexes the whole codebase, so it
+    runs in a worker thread to keep the event loop serving other requests.
+    """
     global _indexer
     if _indexer is None:
-        if INDEX_PATH.exists():
-            _indexer = CodebaseIndexer.load_index(INDEX_PATH, PROJECT_ROOT)
-        else:
-            # Build index on first run
-            _indexer = CodebaseIndexer(PROJECT_ROOT)
-            _indexer.index_codebase()
-            _indexer.save_index(INDEX_PATH)
+        async with _indexer_lock:
+            if _indexer is None:
+                _indexer = await asyncio.to_thread(_load_or_build)
     return _indexer
 
 
@@ -44,379 +70,507 @@ def get_indexer() -> CodebaseIndexer:
 app = Server("codebase-search")
 
 
+# Tool definitions never change, so build them once rather than on every listing
+_TOOLS_CACHED: list[Tool] = [
+    Tool(
+        name="search_code",
+        description="Search the codebase for functions, classes, routes, models, tables, or documentation. "
+                   "Searches across Python code, SQL files, and Markdown documentation. "
+                   "For Markdown docs, searches titles and full content. "
+                   "Use this to find where specific functionality is implemented or documented.",
+        inputSchema={
+            "type": "object",
+            "properties": {
+                "query": {
+                    "type": "string",
+                    "description": "Search query (function name, class name, concept, documentation topic, etc.)"
+                },
+                "type": {
+                    "type": "string",
+                    "enum": ["function", "class", "route", "model", "table", "file"],
+                    "description": "Filter by component type. Use 'file' for Markdown docs (optional)"
+                },
+                "limit": {
+                    "type": "integer",
+                    "default": 10,
+                    "description": "Maximum number of results"
+                }
+            },
+            "required": ["query"]
+        }
+    ),
+    Tool(
+        name="find_route",
+        description="Find a Flask route by path or handler name. "
+                   "Use this to locate web endpoints and see their implementation.",
+        inputSchema={
+            "type": "object",
+            "properties": {
+                "route": {
+                    "type": "string",
+                    "description": "Route path (e.g., '/voters') or handler function name"
+                }
+            },
+            "required": ["route"]
+        }
+    ),
+    Tool(
+        name="find_model",
+        description="Find a database model class by name. "
+                   "Use this to understand database schema and ORM models.",
+        inputSchema={
+            "type": "object",
+            "properties": {
+                "model_name": {
+                    "type": "string",
+                    "description": "Name of the model class (e.g., 'User', 'Product')"
+                }
+            },
+            "required": ["model_name"]
+        }
+    ),
+    Tool(
+        name="find_table",
+        description="Find a database table by name and see its SQL definition. "
+                   "Use this to understand table structure and migrations.",
+        inputSchema={
+            "type": "object",
+            "properties": {
+                "table_name": {
+                    "type": "string",
+                    "description": "Name of the database table (e.g., 'flippable', 'voters')"
+                }
+            },
+            "required": ["table_name"]
+        }
+    ),
+    Tool(
+        name="list_components",
+        description="List all components of a specific type in the codebase. "
+                   "Use this to get an overview of routes, models, tables, or key functions.",
+        inputSchema={
+            "type": "object",
+            "properties": {
+                "component_type": {
+                    "type": "string",
+                    "enum": ["route", "model", "table", "class"],
+                    "description": "Type of component to list"
+                }
+            },
+            "required": ["component_type"]
+        }
+    ),
+    Tool(
+        name="explain_file",
+        description="Get detailed information about a specific file including its purpose, "
+                   "main functions/classes, and dependencies.",
+        inputSchema={
+            "type": "object",
+            "properties": {
+                "filepath": {
+                    "type": "string",
+                    "description": "Relative path to the file (e.g., 'main.py', 'models.py')"
+                }
+            },
+            "required": ["filepath"]
+        }
+    ),
+    Tool(
+        name="rebuild_index",
+        description="Rebuild the codebase index from scratch. "
+                   "Use this after making significant code changes or if search results seem stale.",
+        inputSchema={
+            "type": "object",
+            "properties": {}
+        }
+    )
+]
+
+
 @app.list_tools()
 async def list_tools() -> list[Tool]:
     """List available MCP tools."""
-    return [
-        Tool(
-            name="search_code",
-            description="Search the codebase for functions, classes, routes, models, tables, or documentation. "
-                       "Searches across Python code, SQL files, and Markdown documentation. "
-                       "For Markdown docs, searches titles and full content. "
-                       "Use this to find where specific functionality is implemented or documented.",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "query": {
-                        "type": "string",
-                        "description": "Search query (function name, class name, concept, documentation topic, etc.)"
-                    },
-                    "type": {
-                        "type": "string",
-                        "enum": ["function", "class", "route", "model", "table", "file"],
-                        "description": "Filter by component type. Use 'file' for Markdown docs (optional)"
-                    },
-                    "limit": {
-                        "type": "integer",
-                        "default": 10,
-                        "description": "Maximum number of results"
-                    }
-                },
-                "required": ["query"]
-            }
-        ),
-        Tool(
-            name="find_route",
-            description="Find a Flask route by path or handler name. "
-                       "Use this to locate web endpoints and see their implementation.",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "route": {
-                        "type": "string",
-                        "description": "Route path (e.g., '/voters') or handler function name"
-                    }
-                },
-                "required": ["route"]
-            }
-        ),
-        Tool(
-            name="find_model",
-            description="Find a database model class by name. "
-                       "Use this to understand database schema and ORM models.",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "model_name": {
-                        "type": "string",
-                        "description": "Name of the model class (e.g., 'User', 'Product')"
-                    }
-                },
-                "required": ["model_name"]
-            }
-        ),
-        Tool(
-            name="find_table",
-            description="Find a database table by name and see its SQL definition. "
-                       "Use this to understand table structure and migrations.",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "table_name": {
-                        "type": "string",
-                        "description": "Name of the database table (e.g., 'flippable', 'voters')"
-                    }
-                },
-                "required": ["table_name"]
-            }
-        ),
-        Tool(
-            name="list_components",
-            description="List all components of a specific type in the codebase. "
-                       "Use this to get an overview of routes, models, tables, or key functions.",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "component_type": {
-                        "type": "string",
-                        "enum": ["route", "model", "table", "class"],
-                        "description": "Type of component to list"
-                    }
-                },
-                "required": ["component_type"]
-            }
-        ),
-        Tool(
-            name="explain_file",
-            description="Get detailed information about a specific file including its purpose, "
-                       "main functions/classes, and dependencies.",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "filepath": {
-                        "type": "string",
-                        "description": "Relative path to the file (e.g., 'main.py', 'models.py')"
-                    }
-                },
-                "required": ["filepath"]
-            }
-        ),
-        Tool(
-            name="rebuild_index",
-            description="Rebuild the codebase index from scratch. "
-                       "Use this after making significant code changes or if search results seem stale.",
-            inputSchema={
-                "type": "object",
-                "properties": {}
-            }
-        )
-    ]
+    return _TOOLS_CACHED
 
 
-@app.call_tool()
-async def call_tool(name: str, arguments: Any) -> Sequence[TextContent]:
-    """Handle tool calls."""
+@functools.lru_cache(maxsize=512)
+def _cached_search(indexer: CodebaseIndexer, query: str, comp_type: str | None, limit: int) -> tuple:
+    """Ranked hits for a repeated (query, type, limit); cleared when the index is rebuilt."""
+    return tuple(indexer.search(query, component_type=comp_type, limit=limit))
+
+
+# Responses are built here from indexed data, so skip pydantic validation when possible
+_construct_text = getattr(TextContent, 'model_construct', None) or TextContent
+
+
+def _text(text: str) -> list[TextContent]:
+    """Wrap a server-built response in a single TextContent."""
+    return [_construct_text(type="text", text=text)]
+
+
+_LINE_KEY = attrgetter('line_start')
+
+
+# Line prefixes shared by the result formatters, written into the buffer as-is
+_BULLET_FILE = "\n   📄 `"
+_BULLET_SIG = "\n   🔧 `"
+_BULLET_CLASS = "\n   👪 Class: `"
+_BULLET_DECORATORS = "\n   🎨 Decorators: "
+_BULLET_DOC = "\n   📝 "
+_BULLET_ROUTE = "\n   🌐 Route: `"
+_BULLET_BASES = "\n   🧬 Inherits: "
+_CLOSE_TICK = "`"
+
+
+async def _handle_search_code(arguments: Any) -> Sequence[TextContent]:
+    """Search components by name, docstring, path, or file content."""
+    indexer = await get_indexer()
     
-    if name == "search_code":
-        indexer = get_indexer()
-        query = arguments["query"]
-        comp_type = arguments.get("type")
-        limit = arguments.get("limit", 10)
-        
-        results = indexer.search(query, component_type=comp_type, limit=limit)
-        
-        if not results:
-            return [TextContent(
-                type="text",
-                text=f"No results found for '{query}'"
-            )]
-        
-        # Format results
-        output = [f"🔎 Found {len(results)} results for '{query}':\n"]
-        
-        for i, result in enumerate(results, 1):
-            output.append(f"\n{i}. **{result['type'].upper()}**: `{result['name']}`")
-            output.append(f"   📄 `{result['filepath']}:{result['line_start']}-{result['line_end']}`")
-            
-            if result.get('signature'):
-                output.append(f"   🔧 `{result['signature']}`")
-            
-            if result.get('parent_class'):
-                output.append(f"   👪 Class: `{result['parent_class']}`")
-            
-            if result.get('decorators'):
-                output.append(f"   🎨 Decorators: {', '.join(f'`{d}`' for d in result['decorators'])}")
-            
-            if result.get('docstring'):
-                docstring = result['docstring'][:150]
-                if len(result['docstring']) > 150:
-                    docstring += "..."
-                output.append(f"   📝 {docstring}")
-            
-            if result.get('metadata', {}).get('route_path'):
-                output.append(f"   🌐 Route: `{result['metadata']['route_path']}`")
-        
-        return [TextContent(type="text", text="\n".join(output))]
+    query = arguments["query"]
+    comp_type = arguments.get("type")
+    limit = arguments.get("limit", 10)
     
-    elif name == "find_route":
-        indexer = get_indexer()
-        route_query = arguments["route"]
-        
-        # Try exact match first
-        if route_query in indexer.routes:
-            comp = indexer.routes[route_query]
-            result = _format_component(comp)
-            return [TextContent(type="text", text=result)]
-        
-        # Search for it
-        results = indexer.search(route_query, component_type='route', limit=5)
-        
-        if not results:
-            return [TextContent(
-                type="text",
-                text=f"No route found for '{route_query}'"
-            )]
-        
-        output = [f"🌐 Found {len(results)} route(s):\n"]
-        for i, result in enumerate(results, 1):
-            route_path = result.get('metadata', {}).get('route_path', 'N/A')
-            output.append(f"\n{i}. `{result['name']}` → `{route_path}`")
-            output.append(f"   📄 `{result['filepath']}:{result['line_start']}`")
-            if result.get('docstring'):
-                output.append(f"   📝 {result['docstring'][:100]}")
-        
-        return [TextContent(type="text", text="\n".join(output))]
+    results = _cached_search(indexer, query, comp_type, limit)
     
-    elif name == "find_model":
-        indexer = get_indexer()
-        model_name = arguments["model_name"]
-        
-        if model_name in indexer.models:
-            comp = indexer.models[model_name]
-            result = _format_component(comp)
-            return [TextContent(type="text", text=result)]
-        
-        # Search for it
-        results = indexer.search(model_name, component_type='model', limit=5)
-        
-        if not results:
-            return [TextContent(
-                type="text",
-                text=f"No model found for '{model_name}'"
-            )]
-        
-        output = [f"🗄️  Found {len(results)} model(s):\n"]
-        for i, result in enumerate(results, 1):
-            output.append(f"\n{i}. **{result['name']}**")
-            output.append(f"   📄 `{result['filepath']}:{result['line_start']}`")
-            bases = result.get('metadata', {}).get('bases', [])
-            if bases:
-                output.append(f"   🧬 Inherits: {', '.join(f'`{b}`' for b in bases)}")
-            if result.get('docstring'):
-                output.append(f"   📝 {result['docstring'][:100]}")
-        
-        return [TextContent(type="text", text="\n".join(output))]
+    if not results:
+        return _text(f"No results found for '{query}'")
     
-    elif name == "find_table":
-        indexer = get_indexer()
-        table_name = arguments["table_name"]
-        
-        if table_name in indexer.tables:
-            comp = indexer.tables[table_name]
-            result = _format_component(comp)
-            return [TextContent(type="text", text=result)]
-        
-        # Search for it
-        results = indexer.search(table_name, component_type='table', limit=5)
-        
-        if not results:
-            return [TextContent(
-                type="text",
-                text=f"No table found for '{table_name}'"
-            )]
-        
-        output = [f"📊 Found {len(results)} table(s):\n"]
-        for i, result in enumerate(results, 1):
-            output.append(f"\n{i}. **{result['name']}**")
-            output.append(f"   📄 `{result['filepath']}:{result['line_start']}-{result['line_end']}`")
-        
-        return [TextContent(type="text", text="\n".join(output))]
+    # Format results
+    buf = io.StringIO()
+    buf.write(f"🔎 Found {len(results)} results for '{query}':\n")
     
-    elif name == "list_components":
-        indexer = get_indexer()
-        comp_type = arguments["component_type"]
-        
-        if comp_type == "route":
-            items = list(indexer.routes.values())
-        elif comp_type == "model":
-            items = list(indexer.models.values())
-        elif comp_type == "table":
-            items = list(indexer.tables.values())
-        elif comp_type == "class":
-            items = list(indexer.classes.values())
-        else:
-            return [TextContent(type="text", text=f"Unknown component type: {comp_type}")]
-        
-        output = [f"📋 {len(items)} {comp_type}(s) in codebase:\n"]
-        
-        for item in sorted(items, key=lambda x: x.name)[:50]:  # Limit to 50
-            output.append(f"\n• `{item.name}` → `{item.filepath}:{item.line_start}`")
-            if comp_type == "route" and item.metadata.get('route_path'):
-                output.append(f"  Route: `{item.metadata['route_path']}`")
-        
-        if len(items) > 50:
-            output.append(f"\n\n... and {len(items) - 50} more. Use search_code to find specific ones.")
-        
-        return [TextContent(type="text", text="\n".join(output))]
+    for i, result in enumerate(results, 1):
+        buf.write(f"\n\n{i}. **{result.type.upper()}**: `{result.name}`")
+        buf.write(_BULLET_FILE)
+        buf.write(f"{result.filepath}:{result.line_start}-{result.line_end}")
+        buf.write(_CLOSE_TICK)
+        
+        if result.signature:
+            buf.write(_BULLET_SIG)
+            buf.write(result.signature)
+            buf.write(_CLOSE_TICK)
+        
+        if result.parent_class:
+            buf.write(_BULLET_CLASS)
+            buf.write(result.parent_class)
+            buf.write(_CLOSE_TICK)
+        
+        if result.decorators:
+            buf.write(_BULLET_DECORATORS)
+            buf.write(', '.join(f'`{d}`' for d in result.decorators))
+        
+        docstring = result.docstring
+        if docstring:
+            docstring = display_docstring(docstring, result.language)
+            if len(docstring) > 150:
+                docstring = docstring[:150] + "..."
+            buf.write(_BULLET_DOC)
+            buf.write(docstring)
+        
+        if result.route_path:
+            buf.write(_BULLET_ROUTE)
+            buf.write(result.route_path)
+            buf.write(_CLOSE_TICK)
     
-    elif name == "explain_file":
-        indexer = get_indexer()
-        filepath = arguments["filepath"]
-        
-        # Find all components in this file
-        components = [c for c in indexer.components if c.filepath == filepath]
-        
-        if not components:
-            return [TextContent(
-                type="text",
-                text=f"File not found: {filepath}"
-            )]
-        
-        # Get file component
-        file_comp = next((c for c in components if c.type == 'file'), None)
-        
-        output = [f"📄 **{filepath}**\n"]
-        
-        if file_comp and file_comp.docstring:
-            output.append(f"**Description**: {file_comp.docstring}\n")
-        
-        # Group by type
-        by_type = {}
-        for comp in components:
-            if comp.type != 'file':
-                by_type.setdefault(comp.type, []).append(comp)
-        
-        for comp_type, items in sorted(by_type.items()):
-            output.append(f"\n**{comp_type.upper()}S** ({len(items)}):")
-            for item in sorted(items, key=lambda x: x.line_start)[:20]:
-                output.append(f"• `{item.name}` (line {item.line_start})")
-                if item.signature:
-                    output.append(f"  {item.signature}")
-        
-        # Show imports if available
-        if file_comp and file_comp.imports:
-            unique_imports = sorted(set(file_comp.imports))[:10]
-            output.append(f"\n**KEY IMPORTS**: {', '.join(f'`{i}`' for i in unique_imports)}")
-            if len(file_comp.imports) > 10:
-                output.append(f" ...and {len(file_comp.imports) - 10} more")
-        
-        return [TextContent(type="text", text="\n".join(output))]
+    return _text(buf.getvalue())
+
+
+async def _handle_find_route(arguments: Any) -> Sequence[TextContent]:
+    """Find a Flask route by path or handler name."""
+    indexer = await get_indexer()
+    routes = indexer.routes
     
-    elif name == "rebuild_index":
-        global _indexer
-        _indexer = CodebaseIndexer(PROJECT_ROOT)
-        _indexer.index_codebase()
-        _indexer.save_index(INDEX_PATH)
-        
-        stats = {
-            'components': len(_indexer.components),
-            'files': len(_indexer.files_indexed),
-            'routes': len(_indexer.routes),
-            'models': len(_indexer.models),
-            'tables': len(_indexer.tables)
-        }
-        
-        return [TextContent(
-            type="text",
-            text=f"✅ Index rebuilt successfully!\n\n"
-                 f"• {stats['components']} components indexed\n"
-                 f"• {stats['files']} files\n"
-                 f"• {stats['routes']} routes\n"
-                 f"• {stats['models']} models\n"
-                 f"• {stats['tables']} tables"
-        )]
+    route_query = arguments["route"]
+    
+    # Try exact match first
+    if route_query in routes:
+        return _text(_exact_hit_text(indexer, 'routes', route_query))
     
-    return [TextContent(type="text", text=f"Unknown tool: {name}")]
+    # Search for it
+    results = _cached_search(indexer, route_query, 'route', 5)
+    
+    if not results:
+        return _text(f"No route found for '{route_query}'")
+    
+    buf = io.StringIO()
+    buf.write(f"🌐 Found {len(results)} route(s):\n")
+    for i, result in enumerate(results, 1):
+        route_path = result.route_path or 'N/A'
+        buf.write(f"\n\n{i}. `{result.name}` → `{route_path}`")
+        buf.write(_BULLET_FILE)
+        buf.write(f"{result.filepath}:{result.line_start}")
+        buf.write(_CLOSE_TICK)
+        docstring = result.docstring
+        if docstring:
+            buf.write(_BULLET_DOC)
+            buf.write(display_docstring(docstring, result.language)[:100])
+    
+    return _text(buf.getvalue())
 
 
-def _format_component(comp) -> str:
-    """Format a component for display."""
-    output = [f"**{comp.type.upper()}**: `{comp.name}`\n"]
-    output.append(f"📄 `{comp.filepath}:{comp.line_start}-{comp.line_end}`\n")
+async def _handle_find_model(arguments: Any) -> Sequence[TextContent]:
+    """Find a database model class by name."""
+    indexer = await get_indexer()
+    models = indexer.models
     
-    if comp.signature:
-        output.append(f"**Signature**: `{comp.signature}`\n")
+    model_name = arguments["model_name"]
     
-    if comp.parent_class:
-        output.append(f"**Class**: `{comp.parent_class}`\n")
+    if model_name in models:
+        return _text(_exact_hit_text(indexer, 'models', model_name))
     
-    if comp.decorators:
-        output.append(f"**Decorators**: {', '.join(f'`{d}`' for d in comp.decorators)}\n")
+    # Search for it
+    results = _cached_search(indexer, model_name, 'model', 5)
     
-    if comp.metadata:
-        if comp.metadata.get('route_path'):
-            output.append(f"**Route**: `{comp.metadata['route_path']}`\n")
-        if comp.metadata.get('bases'):
-            output.append(f"**Inherits**: {', '.join(f'`{b}`' for b in comp.metadata['bases'])}\n")
+    if not results:
+        return _text(f"No model found for '{model_name}'")
     
-    if comp.docstring:
-        output.append(f"\n**Documentation**:\n{comp.docstring}\n")
+    buf = io.StringIO()
+    buf.write(f"🗄️  Found {len(results)} model(s):\n")
+    for i, result in enumerate(results, 1):
+        buf.write(f"\n\n{i}. **{result.name}**")
+        buf.write(_BULLET_FILE)
+        buf.write(f"{result.filepath}:{result.line_start}")
+        buf.write(_CLOSE_TICK)
+        if result.bases:
+            buf.write(_BULLET_BASES)
+            buf.write(', '.join(f'`{b}`' for b in result.bases))
+        docstring = result.docstring
+        if docstring:
+            buf.write(_BULLET_DOC)
+            buf.write(display_docstring(docstring, result.language)[:100])
     
-    if comp.imports:
-        unique_imports = sorted(set(comp.imports))[:5]
-        output.append(f"\n**Key imports**: {', '.join(f'`{i}`' for i in unique_imports)}")
+    return _text(buf.getvalue())
+
+
+async def _handle_find_table(arguments: Any) -> Sequence[TextContent]:
+    """Find a database table by name."""
+    indexer = await get_indexer()
+    tables = indexer.tables
+    
+    table_name = arguments["table_name"]
+    
+    if table_name in tables:
+        return _text(_exact_hit_text(indexer, 'tables', table_name))
+    
+    # Search for it
+    results = _cached_search(indexer, table_name, 'table', 5)
+    
+    if not results:
+        return _text(f"No table found for '{table_name}'")
+    
+    buf = io.StringIO()
+    buf.write(f"📊 Found {len(results)} table(s):\n")
+    for i, result in enumerate(results, 1):
+        buf.write(f"\n\n{i}. **{result.name}**")
+        buf.write(_BULLET_FILE)
+        buf.write(f"{result.filepath}:{result.line_start}-{result.line_end}")
+        buf.write(_CLOSE_TICK)
+    
+    return _text(buf.getvalue())
+
+
+async def _handle_list_components(arguments: Any) -> Sequence[TextContent]:
+    """List all components of one type."""
+    indexer = await get_indexer()
+    
+    comp_type = arguments["component_type"]
+    
+    # Each table is kept sorted by name in the indexer
+    items = indexer.sorted_by_type.get(comp_type)
+    if items is None:
+        return _text(f"Unknown component type: {comp_type}")
+    
+    buf = io.StringIO()
+    buf.write(f"📋 {len(items)} {comp_type}(s) in codebase:\n")
+    
+    for item in items[:50]:  # Limit to 50
+        buf.write(f"\n\n• `{item.name}` → `{item.filepath}:{item.line_start}`")
+        if comp_type == "route" and item.metadata.get('route_path'):
+            buf.write(f"\n  Route: `{item.metadata['route_path']}`")
+    
+    if len(items) > 50:
+        buf.write(f"\n\n\n... and {len(items) - 50} more. Use search_code to find specific ones.")
+    
+    return _text(buf.getvalue())
+
+
+async def _handle_explain_file(arguments: Any) -> Sequence[TextContent]:
+    """Summarize a file's purpose, contents, and dependencies."""
+    indexer = await get_indexer()
+    
+    filepath = arguments["filepath"]
+    
+    # Find all components in this file
+    components = indexer.by_file.get(filepath)
+    
+    if not components:
+        return _text(f"File not found: {filepath}")
     
-    return "\n".join(output)
+    # Get file component
+    file_comp = indexer.file_components.get(filepath)
+    
+    buf = io.StringIO()
+    buf.write(f"📄 **{filepath}**\n")
+    
+    if file_comp and file_comp.docstring:
+        buf.write(f"\n**Description**: {display_docstring(file_comp.docstring, file_comp.metadata.get('language', ''))}\n")
+    
+    # Group by type
+    by_type = defaultdict(list)
+    for comp in components:
+        if comp.type != 'file':
+            by_type[comp.type].append(comp)
+    
+    # One joined string per section
+    for comp_type, items in sorted(by_type.items()):
+        buf.write(f"\n\n**{comp_type.upper()}S** ({len(items)}):")
+        buf.write("".join(
+            f"\n• `{item.name}` (line {item.line_start})\n  {item.signature}" if item.signature
+            else f"\n• `{item.name}` (line {item.line_start})"
+            for item in sorted(items, key=_LINE_KEY)[:20]
+        ))
+    
+    # Show imports if available
+    if file_comp and file_comp.imports:
+        unique_imports = heapq.nsmallest(10, set(file_comp.imports))
+        buf.write(f"\n\n**KEY IMPORTS**: {', '.join(f'`{i}`' for i in unique_imports)}")
+        if len(file_comp.imports) > 10:
+            buf.write(f"\n ...and {len(file_comp.imports) - 10} more")
+    
+    return _text(buf.getvalue())
+
+
+async def _handle_rebuild_index(arguments: Any) -> Sequence[TextContent]:
+    """Rebuild the codebase index from scratch."""
+    global _indexer
+    # Hold the lock so no request loads the old index while the rebuild runs
+    async with _indexer_lock:
+        indexer = _indexer = await asyncio.to_thread(_rebuild)
+        _exact_hit_text.cache_clear()
+        _cached_search.cache_clear()
+    
+    stats = {
+        'components': len(indexer.components),
+        'files': len(indexer.files_indexed),
+        'routes': len(indexer.routes),
+        'models': len(indexer.models),
+        'tables': len(indexer.tables)
+    }
+    
+    return _text(
+        f"✅ Index rebuilt successfully!\n\n"
+        f"• {stats['components']} components indexed\n"
+        f"• {stats['files']} files\n"
+        f"• {stats['routes']} routes\n"
+        f"• {stats['models']} models\n"
+        f"• {stats['tables']} tables"
+    )
+
+
+_HANDLERS: dict[str, Callable[[Any], Awaitable[Sequence[TextContent]]]] = {
+    "search_code": _handle_search_code,
+    "find_route": _handle_find_route,
+    "find_model": _handle_find_model,
+    "find_table": _handle_find_table,
+    "list_components": _handle_list_components,
+    "explain_file": _handle_explain_file,
+    "rebuild_index": _handle_rebuild_index,
+}
+
+
+@app.call_tool()
+async def call_tool(name: str, arguments: Any) -> Sequence[TextContent]:
+    """Handle tool calls."""
+    handler = _HANDLERS.get(name)
+    if handler is None:
+        return _text(f"Unknown tool: {name}")
+    return await handler(arguments)
+
+
+def _docs_sections(comp) -> str:
+    """Documentation and key-imports sections that close every exact-hit display."""
+    docstring = display_docstring(comp.docstring, comp.metadata.get('language', ''))
+    docs = f"\n\n**Documentation**:\n{docstring}\n" if docstring else ""
+    if comp.imports:
+        docs += f"\n\n**Key imports**: {', '.join(f'`{i}`' for i in heapq.nsmallest(5, set(comp.imports)))}"
+    return docs
+
+
+# Sections carry their own leading newline and are empty when absent
+_COMPONENT_TEMPLATE = (
+    "**{type}**: `{name}`\n\n"
+    "📄 `{filepath}:{line_start}-{line_end}`\n"
+    "{signature}{parent_class}{decorators}{route}{bases}{docs}"
+)
+
+
+# Exact lookup-table hits: each component kind writes the sections it always
+# has without checking them, and leaves the ones it never has empty.
+
+def _format_route_hit_fast(comp) -> str:
+    """Format a route: it always has a signature and decorators, never bases."""
+    route_path = comp.metadata.get('route_path')
+    return _COMPONENT_TEMPLATE.format_map({
+        'type': 'ROUTE',
+        'name': comp.name,
+        'filepath': comp.filepath,
+        'line_start': comp.line_start,
+        'line_end': comp.line_end,
+        'signature': f"\n**Signature**: `{comp.signature}`\n",
+        'parent_class': f"\n**Class**: `{comp.parent_class}`\n" if comp.parent_class else "",
+        'decorators': f"\n**Decorators**: {', '.join(f'`{d}`' for d in comp.decorators)}\n",
+        'route': f"\n**Route**: `{route_path}`\n" if route_path else "",
+        'bases': "",
+        'docs': _docs_sections(comp),
+    })
+
+
+def _format_model_hit_fast(comp) -> str:
+    """Format a model: it always has bases, never a signature, class, or route."""
+    return _COMPONENT_TEMPLATE.format_map({
+        'type': 'MODEL',
+        'name': comp.name,
+        'filepath': comp.filepath,
+        'line_start': comp.line_start,
+        'line_end': comp.line_end,
+        'signature': "",
+        'parent_class': "",
+        'decorators': (f"\n**Decorators**: {', '.join(f'`{d}`' for d in comp.decorators)}\n"
+                       if comp.decorators else ""),
+        'route': "",
+        'bases': f"\n**Inherits**: {', '.join(f'`{b}`' for b in comp.metadata['bases'])}\n",
+        'docs': _docs_sections(comp),
+    })
+
+
+def _format_table_hit_fast(comp) -> str:
+    """Format a SQL table: only its name and location are ever set."""
+    return _COMPONENT_TEMPLATE.format_map({
+        'type': 'TABLE',
+        'name': comp.name,
+        'filepath': comp.filepath,
+        'line_start': comp.line_start,
+        'line_end': comp.line_end,
+        'signature': "",
+        'parent_class': "",
+        'decorators': "",
+        'route': "",
+        'bases': "",
+        'docs': "",
+    })
+
+
+_EXACT_HIT_FORMATTERS: dict[str, Callable[[Any], str]] = {
+    'routes': _format_route_hit_fast,
+    'models': _format_model_hit_fast,
+    'tables': _format_table_hit_fast,
+}
+
+
+@functools.lru_cache(maxsize=256)
+def _exact_hit_text(indexer: CodebaseIndexer, table: str, key: str) -> str:
+    """Rendered exact hit for one lookup-table entry; cleared when the index is rebuilt."""
+    return _EXACT_HIT_FORMATTERS[table](getattr(indexer, table)[key])
 
 
 async def main():
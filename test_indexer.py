@@ -0,0 +1,153 @@
+"""Tests for the codebase indexer."""
+
+from pathlib import Path
+
+import pytest
+
+from indexer import CodebaseIndexer
+
+
+PROJECT_FILES = {
+    'app/routes.py': '''"""HTTP routes for users and orders."""
+from flask import Blueprint
+
+bp = Blueprint('api', __name__)
+
+
+@bp.route('/users/<int:user_id>')
+def get_user(user_id):
+    """Return one user by id."""
+
+
+@bp.route('/orders')
+def list_orders():
+    """List every order, newest first."""
+
+
+def _user_cache_key(user_id):
+    return f"user:{user_id}"
+''',
+    'app/models.py': '''"""Database models."""
+
+
+class User(Model):
+    """A registered user of the Straße shop."""
+
+    def email_domain(self):
+        """Domain part of the user's email."""
+
+
+class Order(db.Model):
+    """An order placed by a user."""
+
+
+class OrderLine:
+    pass
+
+
+def order_total(order):
+    """Sum the lines of an order."""
+''',
+    'app/util.py': '''def us():
+    """Two-letter name, shorter than a trigram."""
+
+
+def UserOrders():
+    pass
+''',
+    'db/schema.sql': '''-- Users and orders
+CREATE TABLE users (id INTEGER PRIMARY KEY, email TEXT);
+CREATE TABLE IF NOT EXISTS orders (id INTEGER, user_id INTEGER);
+CREATE VIEW recent_orders AS SELECT * FROM orders;
+''',
+    'docs/Guide.md': '''# User Guide
+
+How users place an order and track it.
+
+## Orders
+
+Orders are listed newest first; see `list_orders`.
+''',
+    'docs/notes.md': '''Plain notes without a heading, mentioning the schema.
+''',
+}
+
+
+def _make_project(root: Path):
+    for rel_path, text in PROJECT_FILES.items():
+        path = root / rel_path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(text, encoding='utf-8')
+
+
+@pytest.fixture(params=['indexed', 'loaded'])
+def indexer(request, tmp_path):
+    """An indexer over the sample project, freshly indexed or loaded from disk."""
+    root = tmp_path / 'project'
+    _make_project(root)
+    indexer = CodebaseIndexer(root)
+    indexer.index_codebase()
+    if request.param == 'loaded':
+        index_path = tmp_path / 'codebase_index.json'
+        indexer.save_index(index_path)
+        indexer = CodebaseIndexer.load_index(index_path, root)
+    return indexer
+
+
+def _brute_force_search(indexer, query, component_type, limit):
+    """Score every component directly from its fields, as search() is specified to."""
+    query = query.lower()
+    scored = []
+    for comp in indexer.components:
+        if component_type and comp.type != component_type:
+            continue
+        language = comp.metadata.get('language', '')
+        key = comp.metadata.get('content_key')
+        content = indexer.content_store.get(key, '').lower() if key else ''
+        if query == comp.name.lower():
+            score = 100
+        elif query in comp.name.lower():
+            score = 50
+        elif query in comp.docstring.lower():
+            score = 20
+        elif query in comp.filepath.lower():
+            score = 10
+        elif language == 'markdown' and query in comp.metadata.get('title', '').lower():
+            score = 30
+        elif language in ('markdown', 'sql') and query in content:
+            score = 15
+        else:
+            continue
+        scored.append((score, comp))
+    scored.sort(key=lambda pair: -pair[0])
+    return [
+        (comp.type, comp.name, comp.filepath, comp.line_start, score)
+        for score, comp in scored[:limit]
+    ]
+
+
+def _queries(indexer):
+    """Every name, every 1-4 character slice of one, and some edge cases."""
+    queries = {'', 'zzzq', 'x\x00y', '\x00', 'STRASSE', 'straße', 'newest first'}
+    for comp in indexer.components:
+        name = comp.name
+        queries.add(name)
+        queries.add(name.upper())
+        for size in range(1, 5):
+            queries.update(name[i:i + size] for i in range(len(name) - size + 1))
+    return sorted(queries)
+
+
+@pytest.mark.parametrize('component_type', [None, 'function', 'class', 'route', 'model', 'table', 'file'])
+@pytest.mark.parametrize('limit', [1, 3, 20, 1000])
+def test_search_matches_brute_force(indexer, component_type, limit):
+    for query in _queries(indexer):
+        hits = indexer.search(query, component_type=component_type, limit=limit)
+        got = [(hit.type, hit.name, hit.filepath, hit.line_start, hit.score) for hit in hits]
+        assert got == _brute_force_search(indexer, query, component_type, limit), query
+
+
+def test_search_tables_built_before_first_search(indexer):
+    # Built off the server's event loop, while loading or indexing
+    assert len(indexer._types) == len(indexer.components)
+    assert indexer._trigram_index